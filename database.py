@@ -1,3 +1,5 @@
+import hashlib
+from sqlalchemy import inspect, text
 from sqlmodel import SQLModel, create_engine, Session
 
 sqlite_file_name = "coc_investigators.db"
@@ -6,8 +8,60 @@ sqlite_url = f"sqlite:///{sqlite_file_name}"
 # check_same_thread=False 是 SQLite 在 Web 框架中的必要配置
 engine = create_engine(sqlite_url, connect_args={"check_same_thread": False})
 
-def create_db_and_tables():
+def schema_version() -> int:
+    """
+    根据模型定义 (表、列、类型、索引) 算出的结构指纹。
+    建表/补列完成后写进 PRAGMA user_version，下次启动指纹一致就跳过整套检查。
+    """
+    parts = []
+    for table in SQLModel.metadata.sorted_tables:
+        parts.append(table.name)
+        parts.extend(f"{col.name}:{col.type.compile(dialect=engine.dialect)}" for col in table.columns)
+        parts.extend(sorted(index.name for index in table.indexes))
+    # user_version 是 32 位有符号整数，取 28 位
+    return int(hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()[:7], 16)
+
+def create_db_and_tables() -> bool:
+    """
+    建表并升级旧库。结构没变 (user_version 和指纹一致) 时直接跳过，返回 False。
+    """
+    version = schema_version()
+    with engine.connect() as conn:
+        if conn.exec_driver_sql("PRAGMA user_version").scalar() == version:
+            return False
+
     SQLModel.metadata.create_all(engine)
+    add_missing_columns()
+    with engine.connect() as conn:
+        # 日志归档后要用增量 VACUUM 回收空间，旧库需要完整 VACUUM 一次这个设置才会生效
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+            conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.exec_driver_sql("VACUUM")
+        # WAL 模式下读和写互不阻塞，在线备份读库时不会卡住正在掷骰的写入
+        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        conn.exec_driver_sql(f"PRAGMA user_version={version}")
+    return True
+
+def add_missing_columns():
+    """
+    create_all 只会建新表，不会给旧表加列。
+    这里对比模型和数据库，把缺少的列用 ALTER TABLE 补上 (新加的字段都是可空的)，
+    并补建缺少的索引，这样旧的 coc_investigators.db 不用删库也能继续用。
+    """
+    db_inspector = inspect(engine)
+    existing_tables = set(db_inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_cols = {col["name"] for col in db_inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_cols:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {col_type}'))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
 
 def get_session():
     with Session(engine) as session:
@@ -1,34 +1,74 @@
+import time
+_boot_start = time.perf_counter()  # 启动计时起点，尽量放在最前面
+
 import random  # <--- 1. 补回缺失的 random
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request, Depends
+import anyio
+from fastapi import FastAPI, Request, Depends, Response
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 from sqlmodel import select, Session
+_deps_loaded = time.perf_counter()
 
 from database import create_db_and_tables, get_session
 from models import Investigator
-from routers import investigators, logs, kp
+from routers import investigators, logs, kp, stats, backup, archive
+from static_assets import STATIC_DIR, CachedStaticFiles, SelectiveGZipMiddleware
+from templating import templates
 
 
 # 定义生命周期管理器
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # --- 启动逻辑 ---
-    create_db_and_tables()
-    print("✅ 数据库表结构已初始化")
-    yield
-    # --- 关闭逻辑 ---
+    db_start = time.perf_counter()
+    if create_db_and_tables():
+        print("✅ 数据库表结构已初始化")
+    else:
+        print("✅ 数据库结构无变化，跳过建表")
+    ready = time.perf_counter()
+    print(f"⏱️ 启动耗时: 依赖 {(_deps_loaded - _boot_start) * 1000:.0f}ms"
+          f" | 模块和路由 {(_routes_loaded - _deps_loaded) * 1000:.0f}ms"
+          f" | 数据库检查 {(ready - db_start) * 1000:.0f}ms"
+          f" | 合计 {(ready - _boot_start) * 1000:.0f}ms")
+    async with anyio.create_task_group() as task_group:
+        # 后台定时在线备份、日志归档整理
+        task_group.start_soon(backup.backup_loop)
+        task_group.start_soon(archive.retention_loop)
+        yield
+        # --- 关闭逻辑 ---
+        task_group.cancel_scope.cancel()
     print("🛑 应用已关闭")
 
 
 app = FastAPI(lifespan=lifespan)
 
-templates = Jinja2Templates(directory="templates")
+# 轮询返回的 HTML 片段超过 1KB 就 gzip 压缩 (压缩等级 6，小主机上省点 CPU)
+# 备份下载已经是 .db.gz，不再重复压缩
+app.add_middleware(SelectiveGZipMiddleware, skip_paths=["/backup/download/"], minimum_size=1024, compresslevel=6)
+app.mount("/static", CachedStaticFiles(directory=STATIC_DIR), name="static")
+
+
+@app.middleware("http")
+async def hold_writes_during_restore(request: Request, call_next):
+    """恢复备份期间拒绝写请求 (POST)，见 routers/backup.py 的 restore_snapshot"""
+    # /backup/ 自己的请求 (包括恢复本身) 不走这个闸门
+    if request.method != "POST" or request.url.path.startswith("/backup/"):
+        return await call_next(request)
+    if not backup.begin_write():
+        return Response("正在恢复备份，请稍后再试", status_code=503)
+    try:
+        return await call_next(request)
+    finally:
+        backup.end_write()
+
 
 # 注册路由
 app.include_router(investigators.router)
 app.include_router(logs.router)
 app.include_router(kp.router)
+app.include_router(stats.router)
+app.include_router(backup.router)
+app.include_router(archive.router)
 # --- 页面路由 ---
 
 @app.get("/", response_class=HTMLResponse)
@@ -72,6 +112,9 @@ async def roll_sanity_check():
     """
 
 
+_routes_loaded = time.perf_counter()
+
+
 if __name__ == "__main__":
     import uvicorn
 
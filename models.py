@@ -155,4 +155,42 @@ class DiceLog(SQLModel, table=True):
     action_name: str        # 记录投了什么 (如 "侦查", "1d6")
     result_text: str        # 记录结果文本 (如 "55/60 成功")
     result_color: str       # 记录颜色 (success, danger, warning 等)
-    created_at: datetime = Field(default_factory=datetime.now)
+    created_at: datetime = Field(default_factory=datetime.now, index=True)
+
+    # --- 结构化检定字段 (仅 d100 技能检定会填写，笔记/状态更新/自定义骰为空) ---
+    investigator_id: Optional[int] = Field(default=None, index=True)  # 被检定的角色 ID
+    skill_name: Optional[str] = Field(default=None)     # 技能名 (如 "侦察")，不含 "XX 的" 前缀
+    dice: Optional[int] = Field(default=None)           # d100 出目
+    target: Optional[int] = Field(default=None)         # 目标值 (技能值)
+    success_level: Optional[str] = Field(default=None)  # 成功等级 (大成功/极难成功/.../大失败)
+
+
+class RollStat(SQLModel, table=True):
+    """
+    掷骰统计聚合表：每个 (角色, 技能, 场次) 一行，随日志写入增量更新。
+    统计页只读这张表，不再扫描整个 DiceLog。
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    investigator_id: Optional[int] = Field(default=None, index=True)
+    investigator_name: str = Field(default="", index=True)
+    skill_name: str = Field(default="", index=True)
+    session_date: str = Field(default="", index=True)  # 场次，按日期划分 (YYYY-MM-DD)，凌晨 6 点前算前一天，见 archive.session_day
+
+    total_count: int = Field(default=0)
+    critical_count: int = Field(default=0)  # 大成功
+    extreme_count: int = Field(default=0)   # 极难成功
+    hard_count: int = Field(default=0)      # 困难成功
+    regular_count: int = Field(default=0)   # 成功
+    failure_count: int = Field(default=0)   # 失败
+    fumble_count: int = Field(default=0)    # 大失败
+
+class DiceLogArchive(SQLModel, table=True):
+    """
+    已结束场次的日志归档：每个场次一行，整场日志序列化成 JSON 后 gzip 压缩存放。
+    热表 DiceLog 只保留最近几场，归档需要时再解压搜索。
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    session_date: str = Field(index=True, unique=True)  # 场次 (YYYY-MM-DD)，和 RollStat 一致
+    entry_count: int = Field(default=0)
+    payload: bytes                                      # gzip(JSON 列表)
+    archived_at: datetime = Field(default_factory=datetime.now)
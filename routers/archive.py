@@ -0,0 +1,246 @@
+# routers/archive.py
+import gzip
+import json
+import sqlite3
+import time
+from datetime import datetime, timedelta
+import anyio
+from fastapi import APIRouter, Request, Depends, Response
+from fastapi.responses import HTMLResponse, RedirectResponse
+from sqlalchemy import func, delete
+from sqlmodel import Session, select
+from database import engine, get_session, sqlite_file_name
+from models import DiceLog, DiceLogArchive
+from routers.logs import logs_to_csv
+from routers.backup import begin_write, end_write
+from templating import templates
+
+router = APIRouter(prefix="/archive", tags=["archive"])
+
+RETENTION_HOT_SESSIONS = 2        # 热表里保留最近几场 (按场次日期)，更早的整场归档
+SESSION_DAY_START_HOUR = 6        # 场次日期的分界点：凌晨 6 点前的记录算前一天那场 (晚上开团常常跨过零点)
+RETENTION_INTERVAL = 24 * 60 * 60  # 自动整理间隔 (秒)，启动后也会先跑一次
+RETENTION_START_DELAY = 30        # 启动后等一会儿再整理，不和首批请求抢
+VACUUM_PAGES = 200                # 增量 VACUUM 每批释放的页数
+VACUUM_PAUSE = 0.005              # 每批之间让出的时间 (秒)
+SEARCH_LIMIT = 200                # 归档搜索最多返回的条数
+
+STATUS_ACTION = "状态更新"  # save_status 写入的 action_name
+
+
+def session_day(created_at: datetime) -> str:
+    """
+    一条记录属于哪一场 (YYYY-MM-DD)。统计 (RollStat.session_date) 和归档 (DiceLogArchive.session_date)
+    都用这个，两边的场次才能对得上。
+    """
+    return (created_at - timedelta(hours=SESSION_DAY_START_HOUR)).strftime("%Y-%m-%d")
+
+
+def _session_day_column():
+    """session_day 的 SQL 版本，给按场次分组 / 筛选的查询用"""
+    return func.date(DiceLog.created_at, f"-{SESSION_DAY_START_HOUR} hours")
+
+
+def _log_to_entry(log: DiceLog) -> dict:
+    entry = log.model_dump()
+    entry["created_at"] = log.created_at.isoformat()
+    return entry
+
+
+def _entry_to_log(entry: dict) -> DiceLog:
+    """还原成不入库的 DiceLog 对象，模板和统计可以直接复用"""
+    data = dict(entry)
+    data["created_at"] = datetime.fromisoformat(data["created_at"])
+    return DiceLog(**data)
+
+
+def load_archive_entries(archive: DiceLogArchive) -> list:
+    """只解压成 dict 列表，不构造 DiceLog (SQLModel 对象构造很慢，批量统计时用这个)"""
+    return json.loads(gzip.decompress(archive.payload))
+
+
+def load_archive(archive: DiceLogArchive) -> list:
+    return [_entry_to_log(e) for e in load_archive_entries(archive)]
+
+
+def closed_session_days(session: Session) -> list:
+    """
+    最近 RETENTION_HOT_SESSIONS 场之前的场次日期 (YYYY-MM-DD)，当前这一场永远不算。
+    """
+    day_col = _session_day_column()
+    days = session.exec(select(day_col).distinct().order_by(day_col.desc())).all()
+    today = session_day(datetime.now())
+    return [d for d in days[RETENTION_HOT_SESSIONS:] if d != today]
+
+
+def collapse_status_updates(session: Session, days: list) -> int:
+    """
+    在要归档的场次 (days) 里，同一个角色连续的多条 "状态更新" 只保留最后一条 (它记着最终的 HP/MP/SAN)。
+    "连续" 指同一场里中间没有这个角色的其他记录。正在进行的场次不动，侧边栏里的记录不会突然消失。
+    每删一批就提交一次，写锁只占一小会儿，不会把掷骰挡到超时。返回删除的条数。
+    """
+    if not days:
+        return 0
+    day_col = _session_day_column()
+    statement = (
+        select(DiceLog.id, DiceLog.investigator_name, DiceLog.action_name, day_col)
+        .where(day_col.in_(days))
+        .order_by(DiceLog.id)
+    )
+    pending = {}  # (场次, 角色名) -> 上一条还没被打断的状态更新 id
+    to_delete = []
+    for log_id, name, action, day in session.exec(statement).all():
+        key = (day, name)
+        if action == STATUS_ACTION:
+            if key in pending:
+                to_delete.append(pending[key])
+            pending[key] = log_id
+        else:
+            pending.pop(key, None)
+
+    # 分批删，避免 IN 参数过多
+    for i in range(0, len(to_delete), 500):
+        session.execute(delete(DiceLog).where(DiceLog.id.in_(to_delete[i:i + 500])))
+        session.commit()
+    return len(to_delete)
+
+
+def archive_closed_sessions(session: Session, days: list) -> int:
+    """
+    把 days 里的场次按场次压缩进 DiceLogArchive，并从热表删除。
+    每归档完一场就提交一次 (读日志、压缩都在写事务之外)，返回归档的条数。
+    """
+    day_col = _session_day_column()
+    archived = 0
+    for day in days:
+        logs = session.exec(select(DiceLog).where(day_col == day).order_by(DiceLog.id)).all()
+        entries = [_log_to_entry(log) for log in logs]
+
+        # 同一天如果已经归档过 (比如补录的日志)，合并进去
+        archive = session.exec(select(DiceLogArchive).where(DiceLogArchive.session_date == day)).first()
+        if archive is None:
+            archive = DiceLogArchive(session_date=day, payload=b"")
+        else:
+            entries = json.loads(gzip.decompress(archive.payload)) + entries
+
+        archive.payload = gzip.compress(json.dumps(entries, ensure_ascii=False).encode("utf-8"))
+        archive.entry_count = len(entries)
+        archive.archived_at = datetime.now()
+        session.add(archive)
+        session.execute(delete(DiceLog).where(day_col == day))
+        session.commit()
+        archived += len(logs)
+    return archived
+
+
+def incremental_vacuum() -> int:
+    """
+    分批把空闲页还给文件系统 (需要 auto_vacuum=INCREMENTAL，见 database.py)。
+    返回释放的页数。
+    """
+    freed = 0
+    conn = sqlite3.connect(sqlite_file_name)
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return 0
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        while free:
+            # incremental_vacuum 每 step 一次只释放一页，execute 只 step 一次，
+            # executescript 会把整批跑完
+            conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGES});")
+            remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if remaining >= free:
+                break
+            freed += free - remaining
+            free = remaining
+            time.sleep(VACUUM_PAUSE)
+    finally:
+        conn.close()
+    return freed
+
+
+def run_retention() -> dict:
+    """整理一次：合并状态更新 -> 归档旧场次 -> 增量 VACUUM"""
+    # 正在恢复备份时这一轮跳过，别把刚恢复的数据又改一遍
+    if not begin_write():
+        return {"collapsed": 0, "archived": 0, "freed_pages": 0}
+    try:
+        with Session(engine) as session:
+            closed = closed_session_days(session)
+            collapsed = collapse_status_updates(session, closed)
+            archived = archive_closed_sessions(session, closed)
+        freed = incremental_vacuum()
+    finally:
+        end_write()
+    return {"collapsed": collapsed, "archived": archived, "freed_pages": freed}
+
+
+async def retention_loop():
+    """由 main.py 的 lifespan 启动，启动后先整理一次，之后每天一次"""
+    await anyio.sleep(RETENTION_START_DELAY)
+    while True:
+        try:
+            result = await anyio.to_thread.run_sync(run_retention)
+            print(f"🗄️ 日志整理完成: 合并 {result['collapsed']} 条状态更新，"
+                  f"归档 {result['archived']} 条，释放 {result['freed_pages']} 页")
+        except Exception as e:
+            print(f"⚠️ 日志整理失败: {e}")
+        await anyio.sleep(RETENTION_INTERVAL)
+
+
+@router.get("/", response_class=HTMLResponse)
+async def archive_page(
+        request: Request,
+        q: str = "",
+        session_date: str = "",
+        session: Session = Depends(get_session)
+):
+    """
+    归档页：列出已归档的场次，按关键字 / 场次搜索 (只在搜索时才解压)
+    """
+    archives = session.exec(select(DiceLogArchive).order_by(DiceLogArchive.session_date.desc())).all()
+
+    results = []
+    searched = bool(q or session_date)
+    if searched:
+        keyword = q.strip().lower()
+        for archive in archives:
+            if session_date and archive.session_date != session_date:
+                continue
+            for log in load_archive(archive):
+                text = f"{log.investigator_name} {log.action_name} {log.result_text}".lower()
+                if keyword in text:
+                    results.append(log)
+            if len(results) >= SEARCH_LIMIT:
+                break
+        results = results[:SEARCH_LIMIT]
+
+    return templates.TemplateResponse("archive.html", {
+        "request": request,
+        "archives": archives,
+        "results": results,
+        "searched": searched,
+        "q": q,
+        "session_date": session_date,
+        "limit": SEARCH_LIMIT,
+    })
+
+
+@router.get("/{session_date}/csv")
+async def export_archive_csv(session_date: str, session: Session = Depends(get_session)):
+    """导出某一场归档日志为 CSV"""
+    archive = session.exec(select(DiceLogArchive).where(DiceLogArchive.session_date == session_date)).first()
+    if not archive:
+        return Response("归档不存在", status_code=404)
+    return Response(
+        content=logs_to_csv(load_archive(archive)),
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename=coc_dice_logs_{session_date}.csv"}
+    )
+
+
+@router.post("/run")
+async def run_retention_now():
+    """手动整理一次"""
+    await anyio.to_thread.run_sync(run_retention)
+    return RedirectResponse(url="/archive/", status_code=303)
@@ -0,0 +1,207 @@
+# routers/backup.py
+import gzip
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+import anyio
+from fastapi import APIRouter, Request, Form, Response
+from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse
+from database import engine, sqlite_file_name, create_db_and_tables
+from templating import templates
+
+router = APIRouter(prefix="/backup", tags=["backup"])
+
+BACKUP_DIR = Path("backups")
+BACKUP_INTERVAL = 30 * 60   # 自动备份间隔 (秒)
+BACKUP_KEEP = 12            # 最多保留的快照数量，多出来的从最旧的开始删
+BACKUP_PAGES = 64           # 每批复制的页数，批次越小越不容易卡住正在写日志的请求
+BACKUP_PAUSE = 0.005        # 每批之间让出的时间 (秒)，让掷骰的写入插进来
+RESTORE_DRAIN_TIMEOUT = 10  # 恢复前等正在处理的写请求结束的最长时间 (秒)
+
+# 自动备份、手动备份、恢复不能同时进行
+_backup_lock = threading.Lock()
+
+# 恢复期间拒绝写请求 (见 main.py 的中间件)，恢复前先等正在处理的写请求结束
+_write_gate = threading.Condition()
+_writes_in_flight = 0
+_restoring = False
+
+
+def begin_write() -> bool:
+    """写请求开始前调用，正在恢复时返回 False"""
+    global _writes_in_flight
+    with _write_gate:
+        if _restoring:
+            return False
+        _writes_in_flight += 1
+        return True
+
+
+def end_write():
+    global _writes_in_flight
+    with _write_gate:
+        _writes_in_flight -= 1
+        _write_gate.notify_all()
+
+
+def _copy_database(src_path, dst_path, pages: int = BACKUP_PAGES, pause: float = BACKUP_PAUSE):
+    """
+    用 SQLite 在线备份 API 复制整个库，不需要停服。
+    做快照时每复制 pages 页就暂停一下，写入方最多只会被挡住一个批次的时间；
+    pages=-1 时一步复制完，不暂停。
+    """
+    src = sqlite3.connect(src_path, isolation_level=None)
+    dst = sqlite3.connect(dst_path)
+    progress = None
+    if pause:
+        progress = lambda status, remaining, total: time.sleep(pause)
+    try:
+        # 先在源库上开一个读事务并保持到复制结束：WAL 模式下它固定住一份快照，
+        # 其他连接照常写入，备份也不会因为中途有人掷骰而从头重来
+        src.execute("BEGIN")
+        src.execute("SELECT count(*) FROM sqlite_master").fetchone()
+        src.backup(dst, pages=pages, progress=progress)
+        src.execute("ROLLBACK")
+    finally:
+        dst.close()
+        src.close()
+
+
+def list_snapshots():
+    """按时间倒序列出 backups/ 下的快照"""
+    if not BACKUP_DIR.exists():
+        return []
+    return sorted(BACKUP_DIR.glob("*.db.gz"), key=lambda p: p.stat().st_mtime, reverse=True)
+
+
+def rotate_snapshots():
+    for old in list_snapshots()[BACKUP_KEEP:]:
+        old.unlink()
+
+
+def create_snapshot(reason: str = "auto") -> Path:
+    """
+    生成一份 gzip 压缩的快照，文件名形如 coc_investigators-20260101-203000-123456-auto.db.gz
+    (带微秒，同一秒内的两次备份不会互相覆盖)。
+    先写临时文件，写完再改名，中途崩溃或磁盘满不会留下半截的快照。
+    """
+    BACKUP_DIR.mkdir(exist_ok=True)
+
+    with _backup_lock:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        target = BACKUP_DIR / f"{Path(sqlite_file_name).stem}-{stamp}-{reason}.db.gz"
+        tmp = BACKUP_DIR / f".{target.name}.tmp"
+        tmp_gz = BACKUP_DIR / f".{target.name}.part"
+        try:
+            _copy_database(sqlite_file_name, tmp)
+            with open(tmp, "rb") as f_in, gzip.open(tmp_gz, "wb") as f_out:
+                shutil.copyfileobj(f_in, f_out)
+            os.replace(tmp_gz, target)
+        finally:
+            for path in (tmp, tmp_gz):
+                if path.exists():
+                    path.unlink()
+        rotate_snapshots()
+    return target
+
+
+def restore_snapshot(name: str):
+    """
+    用指定快照覆盖当前数据库。
+    恢复前会先自动备份一份当前库 (pre-restore)，恢复同样走在线备份 API，不需要重启。
+    从 pre-restore 快照到复制完成这段时间拒绝所有写请求，
+    这期间不会有掷骰写进来再被覆盖掉 (或者混进恢复后的数据里)。
+    RESTORE_DRAIN_TIMEOUT 内还有写请求 (或日志整理) 没结束，就放弃恢复，抛 TimeoutError，当前库不动。
+    """
+    global _restoring
+    snapshot = next((p for p in list_snapshots() if p.name == name), None)
+    if snapshot is None:
+        raise FileNotFoundError(name)
+
+    # 先解压再做 pre-restore 快照，免得轮换把要恢复的这份删掉
+    tmp = BACKUP_DIR / f".{snapshot.name}.restore.tmp"
+    try:
+        with gzip.open(snapshot, "rb") as f_in, open(tmp, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+
+        with _write_gate:
+            _restoring = True
+            if not _write_gate.wait_for(lambda: _writes_in_flight == 0, timeout=RESTORE_DRAIN_TIMEOUT):
+                _restoring = False
+                raise TimeoutError("写入没有在限定时间内结束")
+        try:
+            create_snapshot("pre-restore")
+            # 写入已经挡在外面了，分批暂停只会拉长锁库的时间，一步复制完
+            with _backup_lock:
+                _copy_database(tmp, sqlite_file_name, pages=-1, pause=0)
+            # 丢掉连接池里的旧连接，并给旧版本的快照补上新增的表/列
+            engine.dispose()
+            create_db_and_tables()
+        finally:
+            with _write_gate:
+                _restoring = False
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+async def backup_loop():
+    """由 main.py 的 lifespan 启动，定时在线程里做快照"""
+    while True:
+        await anyio.sleep(BACKUP_INTERVAL)
+        try:
+            path = await anyio.to_thread.run_sync(create_snapshot, "auto")
+            print(f"💾 自动备份完成: {path.name}")
+        except Exception as e:
+            print(f"⚠️ 自动备份失败: {e}")
+
+
+@router.get("/", response_class=HTMLResponse)
+async def backup_page(request: Request):
+    """备份管理页：列出快照，手动备份 / 恢复"""
+    snapshots = [
+        {
+            "name": p.name,
+            "size_kb": round(p.stat().st_size / 1024, 1),
+            "created_at": datetime.fromtimestamp(p.stat().st_mtime),
+        }
+        for p in list_snapshots()
+    ]
+    return templates.TemplateResponse("backup.html", {
+        "request": request,
+        "snapshots": snapshots,
+        "interval_min": BACKUP_INTERVAL // 60,
+        "keep": BACKUP_KEEP,
+    })
+
+
+@router.post("/now")
+async def backup_now():
+    """立即做一次手动快照"""
+    await anyio.to_thread.run_sync(create_snapshot, "manual")
+    return RedirectResponse(url="/backup/", status_code=303)
+
+
+@router.get("/download/{name}")
+async def download_snapshot(name: str):
+    snapshot = next((p for p in list_snapshots() if p.name == name), None)
+    if snapshot is None:
+        return Response("快照不存在", status_code=404)
+    # 快照已经是 gzip，main.py 的压缩中间件会跳过这个路径
+    return FileResponse(snapshot, media_type="application/gzip", filename=snapshot.name)
+
+
+@router.post("/restore")
+async def restore(name: str = Form(...)):
+    """用选中的快照恢复数据库"""
+    try:
+        await anyio.to_thread.run_sync(restore_snapshot, name)
+    except FileNotFoundError:
+        return Response("快照不存在", status_code=404)
+    except TimeoutError:
+        return Response("还有写入没有结束，恢复已取消，数据库没有改动，请稍后再试", status_code=503)
+    return RedirectResponse(url="/", status_code=303)
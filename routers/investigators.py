@@ -1,16 +1,17 @@
 import random
 import json
+from typing import Optional
 from urllib.parse import quote
 from fastapi import UploadFile, File
 from fastapi import APIRouter, Request, Depends, Form, Response
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlmodel import Session, select
 from database import get_session
 from models import Investigator, DiceLog
+from routers.stats import record_roll_stat
+from templating import templates
 
 router = APIRouter(prefix="/investigators")
-templates = Jinja2Templates(directory="templates")
 
 
 # --- 新增：CoC 7版 判定逻辑 ---
@@ -64,6 +65,7 @@ async def roll_check(
         skill_name: str = Form(...),
         skill_val: int = Form(...),
         inv_name: str = Form(default="未命名"),
+        inv_id: Optional[int] = Form(default=None),
         session: Session = Depends(get_session)
 ):
     """
@@ -76,9 +78,15 @@ async def roll_check(
         investigator_name=inv_name,
         action_name=skill_name,
         result_text=f"{dice} / {skill_val} ({result})",
-        result_color=color
+        result_color=color,
+        investigator_id=inv_id,
+        skill_name=skill_name,
+        dice=dice,
+        target=skill_val,
+        success_level=result
     )
     session.add(log_entry)
+    record_roll_stat(session, log_entry)
     session.commit()
 
     # --- 关键：设置 HTMX 触发器 ---
@@ -1,14 +1,14 @@
 # routers/kp.py
 from fastapi import APIRouter, Request, Depends, Form
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 from sqlmodel import Session, select
 from database import get_session
 from models import Investigator, DiceLog
 from routers.investigators import calculate_roll_result  # 复用之前的判定逻辑
+from routers.stats import record_roll_stat
+from templating import templates
 
 router = APIRouter(prefix="/kp", tags=["kp"])
-templates = Jinja2Templates(directory="templates")
 
 
 @router.get("/dashboard", response_class=HTMLResponse)
@@ -69,9 +69,16 @@ async def mass_roll(
             investigator_name="KP(暗投)",
             action_name=f"{inv.name} 的 {skill_label}",
             result_text=f"{dice}/{val} {result_type}",
-            result_color="secondary"
+            result_color="secondary",
+            investigator_id=inv.id,
+            skill_name=skill_label,
+            dice=dice,
+            target=val,
+            success_level=result_type
         )
         session.add(log)
+        # 统计算到被投的角色头上，而不是 "KP(暗投)"
+        record_roll_stat(session, log, investigator_name=inv.name)
 
     session.commit()
 
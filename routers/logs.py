@@ -1,17 +1,40 @@
 # routers/logs.py
 from fastapi import APIRouter, Request, Depends, Form
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 from sqlmodel import Session, select
 from database import get_session
 from models import DiceLog
+from templating import templates
 import csv
 import io
 from fastapi.responses import StreamingResponse # 用于流式下载文件
 
 # 注意：prefix 设置为 "/logs"，tags 用于自动文档归类
 router = APIRouter(prefix="/logs", tags=["logs"])
-templates = Jinja2Templates(directory="templates")
+
+
+def logs_to_csv(logs) -> str:
+    """
+    把日志列表写成 CSV 文本 (归档导出也复用)
+    """
+    # 使用 StringIO 在内存中构建 CSV
+    output = io.StringIO()
+    writer = csv.writer(output)
+
+    # 写表头
+    writer.writerow(["ID", "时间", "调查员", "动作", "结果文本", "结果类型"])
+
+    # 写数据
+    for log in logs:
+        writer.writerow([
+            log.id,
+            log.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            log.investigator_name,
+            log.action_name,
+            log.result_text,
+            log.result_color
+        ])
+    return output.getvalue()
 
 
 @router.get("/latest", response_class=HTMLResponse)
@@ -58,36 +81,15 @@ async def add_note(
 @router.get("/export_csv")
 async def export_logs_csv(session: Session = Depends(get_session)):
     """
-    导出所有投骰日志为 CSV 文件
+    导出热表里的投骰日志为 CSV 文件 (已归档的场次在 /archive/ 页面单独导出)
     """
     # 1. 查询所有日志 (按时间倒序)
     statement = select(DiceLog).order_by(DiceLog.created_at.desc())
     logs = session.exec(statement).all()
 
-    # 2. 使用 StringIO 在内存中构建 CSV
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    # 写表头
-    writer.writerow(["ID", "时间", "调查员", "动作", "结果文本", "结果类型"])
-
-    # 写数据
-    for log in logs:
-        writer.writerow([
-            log.id,
-            log.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            log.investigator_name,
-            log.action_name,
-            log.result_text,
-            log.result_color
-        ])
-
-    # 指针回到开头
-    output.seek(0)
-
-    # 3. 返回流式响应
+    # 2. 返回流式响应
     return StreamingResponse(
-        iter([output.getvalue()]),
+        iter([logs_to_csv(logs)]),
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=coc_dice_logs.csv"}
     )
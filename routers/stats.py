@@ -0,0 +1,233 @@
+# routers/stats.py
+import re
+from collections import Counter
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Optional
+import anyio
+from fastapi import APIRouter, Request, Depends
+from fastapi.responses import HTMLResponse, RedirectResponse
+from sqlalchemy import func, delete, insert, update
+from sqlmodel import Session, select
+from database import engine, get_session
+from models import DiceLog, RollStat, DiceLogArchive
+from routers.archive import load_archive_entries, session_day
+from templating import templates
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+# 成功等级 -> RollStat 计数列
+LEVEL_COLUMNS = {
+    "大成功": "critical_count",
+    "极难成功": "extreme_count",
+    "困难成功": "hard_count",
+    "成功": "regular_count",
+    "失败": "failure_count",
+    "大失败": "fumble_count",
+}
+SUCCESS_LEVELS = ("大成功", "极难成功", "困难成功", "成功")
+
+# 不能获得成长标记的检定 (属性、幸运、理智、信用、克苏鲁神话)
+NON_IMPROVABLE = {
+    "力量", "敏捷", "意志", "体质", "外貌", "体型", "智力", "教育",
+    "幸运", "理智检定(SC)", "信用", "克苏鲁神话",
+}
+
+COUNT_COLUMNS = ["total_count", *LEVEL_COLUMNS.values()]
+
+# 旧日志只有文本结果，例如 "55 / 60 (成功)" (roll_check) 或 "55/60 成功" (mass_roll)
+LEGACY_RESULT_RE = re.compile(r"^\s*(\d+)\s*/\s*(\d+)\s*\(?\s*(大成功|极难成功|困难成功|成功|大失败|失败)\s*\)?\s*$")
+
+
+def session_key(log: DiceLog) -> str:
+    """场次按日期划分，凌晨的掷骰算前一天那场 (和归档用同一个规则，见 archive.session_day)"""
+    return session_day(log.created_at)
+
+
+def record_roll_stat(session: Session, log: DiceLog, investigator_name: Optional[str] = None):
+    """
+    根据一条结构化检定日志，增量更新 RollStat。
+    调用方负责 commit (和日志写入放在同一个事务里)。
+    investigator_name: KP 暗投时日志记的是 "KP(暗投)"，统计要算到被投的角色头上。
+    """
+    column = LEVEL_COLUMNS.get(log.success_level)
+    if column is None or not log.skill_name:
+        return
+
+    name = investigator_name or log.investigator_name
+    day = session_key(log)
+    statement = select(RollStat).where(
+        RollStat.investigator_id == log.investigator_id,
+        RollStat.investigator_name == name,
+        RollStat.skill_name == log.skill_name,
+        RollStat.session_date == day,
+    )
+    stat = session.exec(statement).first()
+    if stat is None:
+        stat = RollStat(
+            investigator_id=log.investigator_id,
+            investigator_name=name,
+            skill_name=log.skill_name,
+            session_date=day,
+        )
+    stat.total_count += 1
+    setattr(stat, column, getattr(stat, column) + 1)
+    session.add(stat)
+
+
+def parse_legacy_log(log: DiceLog):
+    """
+    从旧日志的 result_text / action_name 里还原结构化字段。
+    返回 (被检定角色名, 技能名, 出目, 目标值, 成功等级)，不是 d100 检定则返回 None。
+    """
+    match = LEGACY_RESULT_RE.match(log.result_text or "")
+    if not match:
+        return None
+    dice, target, level = int(match.group(1)), int(match.group(2)), match.group(3)
+
+    name, skill = log.investigator_name, log.action_name
+    if " 的 " in skill:  # mass_roll: "张三 的 聆听"
+        name, skill = skill.rsplit(" 的 ", 1)
+    return name, skill, dice, target, level
+
+
+def _roll_fields(log: DiceLog):
+    """
+    重新统计用：返回 (统计到谁头上, 技能名, 出目, 目标值, 成功等级)，不是 d100 检定则返回 None。
+    旧日志从文本里解析；KP 暗投记在 "KP(暗投)" 名下，要算到被投的角色头上。
+    """
+    if log.success_level is None:
+        return parse_legacy_log(log)
+    name = log.investigator_name
+    if name == "KP(暗投)" and " 的 " in log.action_name:
+        name = log.action_name.rsplit(" 的 ", 1)[0]
+    return name, log.skill_name, log.dice, log.target, log.success_level
+
+
+def _count_roll(counts: dict, log: DiceLog, fields):
+    """在内存里累加一条检定，counts: (角色id, 角色名, 技能, 场次) -> Counter"""
+    name, skill, _, _, level = fields
+    column = LEVEL_COLUMNS.get(level)
+    if column is None or not skill:
+        return
+    counter = counts.setdefault((log.investigator_id, name, skill, session_key(log)), Counter())
+    counter["total_count"] += 1
+    counter[column] += 1
+
+
+def rebuild_roll_stats() -> int:
+    """
+    清空并从 DiceLog 和归档重新计算 RollStat，返回统计行数。
+    先在内存里计数，最后一个短事务里整表替换，不会长时间占着写锁；
+    热表里的旧日志顺便分批补上结构化字段。在线程里跑 (见 rebuild_stats)。
+    """
+    counts = {}
+    backfill = []  # 热表旧日志要补写的结构化字段
+    with Session(engine) as session:
+        hot_logs = session.exec(select(DiceLog).order_by(DiceLog.id)).all()
+        last_id = hot_logs[-1].id if hot_logs else 0
+        for log in hot_logs:
+            fields = _roll_fields(log)
+            if fields is None:
+                continue
+            if log.success_level is None:
+                _, skill, dice, target, level = fields
+                backfill.append({"id": log.id, "skill_name": skill, "dice": dice, "target": target, "success_level": level})
+            _count_roll(counts, log, fields)
+
+        for archive in session.exec(select(DiceLogArchive)).all():
+            for entry in load_archive_entries(archive):
+                # 只读属性，用轻量对象代替 DiceLog，省掉构造 ORM 对象的开销
+                entry["created_at"] = datetime.fromisoformat(entry["created_at"])
+                log = SimpleNamespace(**entry)
+                fields = _roll_fields(log)
+                if fields is not None:
+                    _count_roll(counts, log, fields)
+
+        # 补字段按批提交，每批只占一下写锁
+        for i in range(0, len(backfill), 500):
+            session.execute(update(DiceLog), backfill[i:i + 500])
+            session.commit()
+
+        # 先删表拿到写锁，再把统计期间新写入的日志补算进来，这样不会漏掉正在掷的骰
+        session.execute(delete(RollStat))
+        for log in session.exec(select(DiceLog).where(DiceLog.id > last_id)).all():
+            fields = _roll_fields(log)
+            if fields is not None:
+                _count_roll(counts, log, fields)
+
+        rows = [
+            {
+                "investigator_id": inv_id,
+                "investigator_name": name,
+                "skill_name": skill,
+                "session_date": day,
+                **{col: counter[col] for col in COUNT_COLUMNS},
+            }
+            for (inv_id, name, skill, day), counter in counts.items()
+        ]
+        if rows:
+            session.execute(insert(RollStat), rows)
+        session.commit()
+    return len(rows)
+
+
+def _level_sums():
+    """各计数列的 SUM 表达式，给分组查询复用"""
+    return [func.sum(getattr(RollStat, col)).label(col) for col in COUNT_COLUMNS]
+
+
+@router.get("/", response_class=HTMLResponse)
+async def stats_page(request: Request, session: Session = Depends(get_session)):
+    """
+    统计页：按角色 / 技能 / 场次汇总，并给出最近一场的成长标记
+    """
+    by_investigator = session.exec(
+        select(RollStat.investigator_name, *_level_sums())
+        .group_by(RollStat.investigator_name)
+        .order_by(RollStat.investigator_name)
+    ).all()
+
+    by_skill = session.exec(
+        select(RollStat.skill_name, *_level_sums())
+        .group_by(RollStat.skill_name)
+        .order_by(func.sum(RollStat.total_count).desc())
+    ).all()
+
+    by_session = session.exec(
+        select(RollStat.session_date, *_level_sums())
+        .group_by(RollStat.session_date)
+        .order_by(RollStat.session_date.desc())
+    ).all()
+
+    # 成长标记：最近一场中，技能检定至少成功一次
+    latest_session = by_session[0].session_date if by_session else None
+    ticks = {}
+    if latest_session:
+        statement = select(RollStat).where(RollStat.session_date == latest_session).order_by(
+            RollStat.investigator_name, RollStat.skill_name
+        )
+        for stat in session.exec(statement).all():
+            if stat.skill_name in NON_IMPROVABLE:
+                continue
+            if sum(getattr(stat, LEVEL_COLUMNS[level]) for level in SUCCESS_LEVELS) > 0:
+                ticks.setdefault(stat.investigator_name, []).append(stat.skill_name)
+
+    return templates.TemplateResponse("stats.html", {
+        "request": request,
+        "by_investigator": by_investigator,
+        "by_skill": by_skill,
+        "by_session": by_session,
+        "latest_session": latest_session,
+        "ticks": ticks,
+    })
+
+
+@router.post("/rebuild")
+async def rebuild_stats():
+    """
+    清空并从 DiceLog 和归档重新计算统计 (用于升级前的旧日志)。
+    热表里的旧日志会顺便补上结构化字段。
+    """
+    await anyio.to_thread.run_sync(rebuild_roll_stats)
+    return RedirectResponse(url="/stats/", status_code=303)
@@ -0,0 +1,53 @@
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import parse_qs
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.staticfiles import StaticFiles
+
+STATIC_DIR = Path("static")
+
+# 带指纹的静态文件一年内不会变 (内容一改指纹就变)，浏览器可以放心一直缓存
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+
+@lru_cache(maxsize=None)
+def _fingerprint(path: str) -> str:
+    """文件内容的短哈希，进程内缓存，改了静态文件需要重启服务"""
+    return hashlib.sha256((STATIC_DIR / path).read_bytes()).hexdigest()[:10]
+
+
+def static_url(path: str) -> str:
+    """
+    模板里用 {{ static_url('js/music_player.js') }} 生成带指纹的地址：
+    /static/js/music_player.js?v=1a2b3c4d5e
+    """
+    return f"/static/{path}?v={_fingerprint(path)}"
+
+
+class CachedStaticFiles(StaticFiles):
+    """带 ?v= 指纹的请求返回 immutable 缓存头，手机热点下不用每次重新下载"""
+
+    async def get_response(self, path, scope):
+        response = await super().get_response(path, scope)
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        if response.status_code == 200 and "v" in query:
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE
+        return response
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """
+    和 GZipMiddleware 一样，但跳过 skip_paths 开头的路径。
+    备份下载本身就是 .db.gz，再压一遍只会白白占用小主机的 CPU。
+    """
+
+    def __init__(self, app, skip_paths=(), **kwargs):
+        super().__init__(app, **kwargs)
+        self.skip_paths = tuple(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(self.skip_paths):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
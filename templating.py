@@ -0,0 +1,6 @@
+from fastapi.templating import Jinja2Templates
+from static_assets import static_url
+
+# 所有路由共用这一个模板环境，base.html 用到的全局函数只在这里注册一次
+templates = Jinja2Templates(directory="templates")
+templates.env.globals["static_url"] = static_url